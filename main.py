@@ -3,19 +3,139 @@ import sys
 import csv
 import json
 import time
+import errno
+import queue
 import shutil
+import struct
+import sqlite3
 import logging
+import logging.handlers
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, List
+from typing import Iterator, Optional, List
 
-import cv2
-from pyzbar import pyzbar
-from PIL import Image
-from PIL.ExifTags import TAGS
-from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+# PhotoProcessor's thread pool owns the parallelism; keep OpenCV's own
+# worker threads (cv2 is imported lazily) from multiplying on top of it.
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+
+_PATIENT_PREFIX = "PATIENT_ID:"
+_PATIENT_PREFIX_LEN = len(_PATIENT_PREFIX)
+_DEFAULT_FORMATS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+_JPEG_SUFFIXES = ('.jpg', '.jpeg')
+_EXIF_HEADER = b'Exif\x00\x00'
+_EXIF_DATETIME = 0x0132
+_EXIF_DATETIME_ORIGINAL = 0x9003
+_EXIF_IFD_POINTER = 0x8769
+_EXIF_ASCII = 2
+
+_SEGMENT_LENGTH = struct.Struct('>H')
+_TIFF_U16 = {b'II': struct.Struct('<H'), b'MM': struct.Struct('>H')}
+_TIFF_U32 = {b'II': struct.Struct('<I'), b'MM': struct.Struct('>I')}
+_TIFF_ENTRY = {b'II': struct.Struct('<HHII'), b'MM': struct.Struct('>HHII')}
+
+_QR_MAX_SIDE = 1600
+_LINK_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK}
+_QR_RECENT_SIZE = 256
+
+
+def _parse_exif_dt(value: str) -> datetime:
+    try:
+        return datetime(
+            int(value[0:4]), int(value[5:7]), int(value[8:10]),
+            int(value[11:13]), int(value[14:16]), int(value[17:19]),
+        )
+    except ValueError:
+        return datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
+
+
+def _read_ifd_tags(tiff: memoryview, offset: int, byte_order: bytes, wanted: tuple) -> dict:
+    count = _TIFF_U16[byte_order].unpack_from(tiff, offset)[0]
+    entry = _TIFF_ENTRY[byte_order]
+    found = {}
+    for i in range(count):
+        tag, tag_type, size, value = entry.unpack_from(tiff, offset + 2 + i * 12)
+        if tag not in wanted:
+            continue
+        if tag == _EXIF_IFD_POINTER:
+            found[tag] = value
+        elif tag_type == _EXIF_ASCII and size > 4:
+            found[tag] = bytes(tiff[value:value + size]).rstrip(b'\x00').decode('ascii')
+    return found
+
+
+def _exif_date_from_tiff(tiff: memoryview) -> Optional[str]:
+    byte_order = bytes(tiff[:2])
+    if byte_order not in _TIFF_U32:
+        raise ValueError("invalid TIFF byte order")
+
+    ifd0 = _TIFF_U32[byte_order].unpack_from(tiff, 4)[0]
+    tags = _read_ifd_tags(tiff, ifd0, byte_order, (_EXIF_DATETIME, _EXIF_IFD_POINTER))
+    if _EXIF_IFD_POINTER in tags:
+        exif_tags = _read_ifd_tags(tiff, tags[_EXIF_IFD_POINTER], byte_order, (_EXIF_DATETIME_ORIGINAL,))
+        if _EXIF_DATETIME_ORIGINAL in exif_tags:
+            return exif_tags[_EXIF_DATETIME_ORIGINAL]
+    return tags.get(_EXIF_DATETIME)
+
+
+def _read_jpeg_exif_date(image_path: Path) -> Optional[str]:
+    with open(image_path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            raise ValueError("missing JPEG SOI marker")
+
+        while True:
+            header = f.read(4)
+            if len(header) < 4:
+                raise ValueError("truncated JPEG header")
+            if header[0] != 0xFF:
+                raise ValueError(f"invalid JPEG marker at offset {f.tell() - 4}")
+
+            marker = header[1]
+            if marker == 0xFF:
+                f.seek(-3, os.SEEK_CUR)
+                continue
+            if marker in (0xDA, 0xD9):
+                return None
+            if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+                f.seek(-2, os.SEEK_CUR)
+                continue
+
+            length = _SEGMENT_LENGTH.unpack_from(header, 2)[0]
+            if length < 2:
+                raise ValueError(f"invalid JPEG segment length {length}")
+            if marker != 0xE1:
+                f.seek(length - 2, os.SEEK_CUR)
+                continue
+
+            segment = f.read(length - 2)
+            if len(segment) < length - 2:
+                raise ValueError("truncated APP1 segment")
+            if segment[:6] == _EXIF_HEADER:
+                return _exif_date_from_tiff(memoryview(segment)[6:])
+
+
+@dataclass(slots=True)
+class _ScanEntry:
+    name: str
+    path: str
+    size: int
+    mtime_ns: int
+    ino: int
+
+
+class SessionLimitExceeded(ValueError):
+
+    def __init__(self, count: int, limit: int):
+        super().__init__(f"Photo count exceeds maximum {limit} (stopped counting at {count})")
+        self.count = count
+
 
 class PhotoProcessor:
 
@@ -31,22 +151,98 @@ class PhotoProcessor:
         self.unprocessed_folder_name = self.config.get('unprocessed_folder_name', '_unprocessed')
         self.startup_scan_minutes = self.config.get('startup_scan_minutes', 30)
         self.stop_on_error = self.config.get('stop_on_error', False)
-        self.stop_requested = False
+        self._stop_event = threading.Event()
         self.patient_stats_file = self.config.get('patient_stats_file', 'patient_stats.json')
         self.csv_log_file = self.config.get('csv_log_file', 'photo_history.csv')
-
-        formats = self.config.get('supported_formats', ['.jpg', '.jpeg', '.png', '.gif', '.bmp'])
+        self.backup_use_hardlinks = self.config.get('backup_use_hardlinks', False)
+        self.exif_mtime_slack_hours = self.config.get('exif_mtime_slack_hours', 24)
+        self.use_exif_timestamp = self.config.get('use_exif_timestamp', True)
+        self.persistent_cache = self.config.get('persistent_cache', False)
+        self.qr_enhance_retry = self.config.get('qr_enhance_retry', False)
+        self.qr_max_size = self.config.get('qr_max_size', 0)
+        self.qr_fast_scan = self.config.get('qr_fast_scan', False)
+        self.backup_workers = self.config.get('backup_workers', 4)
+
+        formats = self.config.get('supported_formats', _DEFAULT_FORMATS)
         self._supported_formats = {fmt.lower() for fmt in formats}
+        self._suffix_tuple = tuple(sorted(self._supported_formats))
+        self._cv_local = threading.local()
+        self._cv2 = None
+        self._pil_image = None
+        self._zbar = None
+        self._qr_read_flags = ()
+        self._ts_cache: dict[str, tuple[int, int, datetime]] = {}
+        self._seq_counters: dict[tuple[str, str], tuple[int, int]] = {}
+        self._closed = False
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._session_lock = threading.Lock()
+        self._qr_recent: OrderedDict[tuple, Optional[str]] = OrderedDict()
+        self._qr_recent_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 4) * 2))
+        self._backup_pool = ThreadPoolExecutor(max_workers=self.backup_workers)
 
         self.setup_logging()
 
         if not self.watch_folder.exists():
             self.logger.error(f"Watch folder does not exist: {self.watch_folder}")
+            self.close()
             raise FileNotFoundError(f"Watch folder not found: {self.watch_folder}")
 
+        self._backup_dir = self.watch_folder / self.backup_folder_name
+        self._error_dir = self.watch_folder / self.error_folder_name
+        self._done_dir = self.watch_folder / self.done_folder_name
+        self._unprocessed_dir = self.watch_folder / self.unprocessed_folder_name
+        for folder in (self._backup_dir, self._error_dir, self._done_dir, self._unprocessed_dir):
+            folder.mkdir(parents=True, exist_ok=True)
+
+        self._watch_dev = self.watch_folder.stat().st_dev
+        self._same_fs_backup = self.backup_use_hardlinks and self._backup_dir.stat().st_dev == self._watch_dev
+        self._same_fs_dest = True
+
+        if self.persistent_cache:
+            self._db = self._open_cache_db()
+
         self.logger.info("Photo Processor initialized")
         self.logger.info(f"Watching folder: {self.watch_folder}")
 
+    def _open_cache_db(self) -> sqlite3.Connection:
+        db = sqlite3.connect(
+            self.watch_folder / '_cache.sqlite', isolation_level=None, check_same_thread=False
+        )
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS meta("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, ts TEXT, qr TEXT)"
+        )
+
+        present = {os.path.join(self.watch_folder, name) for name in os.listdir(self.watch_folder)}
+        gone = [(path,) for (path,) in db.execute("SELECT path FROM meta") if path not in present]
+        db.executemany("DELETE FROM meta WHERE path = ?", gone)
+        return db
+
+    def _cache_lookup(self, path: str, mtime_ns: int) -> Optional[tuple]:
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT ts, qr FROM meta WHERE path = ? AND mtime_ns = ?", (path, mtime_ns)
+            ).fetchone()
+
+    def _cache_store(self, path: str, mtime_ns: int, ts: Optional[str] = None, qr: Optional[str] = None):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT INTO meta(path, mtime_ns, ts, qr) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET "
+                "ts = COALESCE(excluded.ts, CASE WHEN mtime_ns = excluded.mtime_ns THEN ts END), "
+                "qr = COALESCE(excluded.qr, CASE WHEN mtime_ns = excluded.mtime_ns THEN qr END), "
+                "mtime_ns = excluded.mtime_ns",
+                (path, mtime_ns, ts, qr),
+            )
+
+    def _cache_forget(self, paths):
+        with self._db_lock:
+            self._db.executemany("DELETE FROM meta WHERE path = ?", [(path,) for path in paths])
+
     def load_config(self, config_path: str) -> dict:
         try:
             with open(config_path, 'r') as f:
@@ -64,6 +260,7 @@ class PhotoProcessor:
 
         self.logger = logging.getLogger('PhotoProcessor')
         self.logger.setLevel(log_level)
+        self._debug_on = self.logger.isEnabledFor(logging.DEBUG)
 
         file_handler = logging.FileHandler(log_file, encoding='utf-8')
         file_handler.setLevel(log_level)
@@ -77,115 +274,328 @@ class PhotoProcessor:
         file_handler.setFormatter(formatter)
         console_handler.setFormatter(formatter)
 
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        log_queue = queue.Queue(-1)
+        self._log_listener = logging.handlers.QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True
+        )
+        self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        self._log_listener.start()
 
     def is_image_file(self, filepath: Path) -> bool:
-        return filepath.suffix.lower() in self._supported_formats
+        return filepath.name.lower().endswith(self._suffix_tuple)
 
     def get_exif_date(self, image_path: Path) -> Optional[datetime]:
         try:
-            image = Image.open(image_path)
-            exif_data = image._getexif()
-
-            if exif_data is None:
+            value = self._read_exif_date_value(image_path)
+            if value is None:
                 return None
-
-            for tag_id, value in exif_data.items():
-                tag_name = TAGS.get(tag_id, tag_id)
-                if tag_name in ['DateTimeOriginal', 'DateTime']:
-                    return datetime.strptime(value, "%Y:%m:%d %H:%M:%S")
-
-            return None
+            return _parse_exif_dt(value)
         except Exception as e:
             self.logger.warning(f"Could not extract EXIF from {image_path.name}: {e}")
             return None
 
+    def _read_exif_date_value(self, image_path: Path) -> Optional[str]:
+        if image_path.suffix.lower() in _JPEG_SUFFIXES:
+            try:
+                return _read_jpeg_exif_date(image_path)
+            except (ValueError, struct.error, UnicodeDecodeError) as e:
+                if self._debug_on:
+                    self.logger.debug("Fast EXIF parse failed for %s, using PIL: %s", image_path.name, e)
+
+        with self._pillow().open(image_path) as image:
+            exif = image.getexif()
+            return exif.get_ifd(_EXIF_IFD_POINTER).get(_EXIF_DATETIME_ORIGINAL) or exif.get(_EXIF_DATETIME)
+
     def get_image_timestamp(self, image_path: Path) -> datetime:
-        exif_date = self.get_exif_date(image_path)
-        if exif_date:
-            return exif_date
+        st = image_path.stat()
+        return self._cached_timestamp(str(image_path), st.st_mtime_ns, st.st_size)
+
+    def _cached_timestamp(self, path: str, mtime_ns: int, size: int) -> datetime:
+        if not self.use_exif_timestamp:
+            return datetime.fromtimestamp(mtime_ns / 1e9)
+
+        entry = self._ts_cache.get(path)
+        if entry and entry[0] == mtime_ns and entry[1] == size:
+            return entry[2]
+
+        if self._db is not None:
+            row = self._cache_lookup(path, mtime_ns)
+            if row is not None and row[0] is not None:
+                timestamp = datetime.fromisoformat(row[0])
+                self._ts_cache[path] = (mtime_ns, size, timestamp)
+                return timestamp
+
+        image_path = Path(path)
+        timestamp = self.get_exif_date(image_path)
+        if timestamp is None:
+            if self._debug_on:
+                self.logger.debug("Using file modification time for %s", image_path.name)
+            timestamp = datetime.fromtimestamp(mtime_ns / 1e9)
+
+        self._ts_cache[path] = (mtime_ns, size, timestamp)
+        if self._db is not None:
+            self._cache_store(path, mtime_ns, ts=timestamp.isoformat())
+        return timestamp
+
+    def _forget_timestamps(self, paths):
+        paths = [path for path in paths if self._ts_cache.pop(path, None) is not None]
+        if paths and self._db is not None:
+            self._cache_forget(paths)
+
+    def _timestamp_or_none(self, image_path: Path) -> Optional[datetime]:
+        try:
+            return self.get_image_timestamp(image_path)
+        except FileNotFoundError:
+            return None
 
-        self.logger.debug(f"Using file modification time for {image_path.name}")
-        return datetime.fromtimestamp(image_path.stat().st_mtime)
+    def get_image_timestamp_from_entry(self, entry: _ScanEntry) -> datetime:
+        return self._cached_timestamp(entry.path, entry.mtime_ns, entry.size)
+
+    def _iter_candidate_entries(self) -> Iterator[_ScanEntry]:
+        with os.scandir(self.watch_folder) as it:
+            for entry in it:
+                if not self._is_candidate(entry.name) or not entry.is_file(follow_symlinks=False):
+                    continue
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                # st_ino is 0 here on Windows; callers resolve it only when needed
+                yield _ScanEntry(entry.name, entry.path, st.st_size, st.st_mtime_ns, st.st_ino)
 
     def detect_qr_code(self, image_path: Path) -> Optional[str]:
         try:
-            image = cv2.imread(str(image_path))
-
-            if image is None:
-                self.logger.warning(f"Could not read image: {image_path.name}")
+            st = image_path.stat()
+            if self.qr_max_size and st.st_size > self.qr_max_size:
                 return None
 
-            qr_codes = pyzbar.decode(image)
-            if not qr_codes:
+            recent_key = (str(image_path), st.st_mtime_ns, st.st_size)
+            with self._qr_recent_lock:
+                if recent_key in self._qr_recent:
+                    self._qr_recent.move_to_end(recent_key)
+                    return self._qr_recent[recent_key]
+
+            if self._db is not None:
+                row = self._cache_lookup(str(image_path), st.st_mtime_ns)
+                if row is not None and row[1] is not None:
+                    if row[1]:
+                        self.logger.info(f"QR code detected in {image_path.name} (cached): {row[1]}")
+                    self._remember_qr(recent_key, row[1] or None, persist=False)
+                    return row[1] or None
+
+            cv2 = self._opencv()
+            qr_data = None
+            for flag in self._qr_read_flags:
+                image = cv2.imread(str(image_path), flag)
+
+                if image is None:
+                    self.logger.warning(f"Could not read image: {image_path.name}")
+                    return None
+
+                if flag == cv2.IMREAD_REDUCED_GRAYSCALE_4:
+                    image = self._limit_qr_side(image)
+                qr_data, located = self._decode_qr(image)
+                if qr_data or (self.qr_fast_scan and not located):
+                    break
+
+            if not qr_data and self.qr_enhance_retry:
+                if flag != cv2.IMREAD_GRAYSCALE:
+                    image = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
+                if image is not None:
+                    qr_data = self._decode_qr_enhanced(image)
+
+            if not qr_data:
+                self._remember_qr(recent_key, None)
                 return None
 
-            qr_data = qr_codes[0].data.decode('utf-8')
             self.logger.info(f"QR code detected in {image_path.name}: {qr_data}")
 
-            return self.parse_patient_id(qr_data)
+            patient_id = self.parse_patient_id(qr_data)
+            self._remember_qr(recent_key, patient_id)
+            return patient_id
 
+        except FileNotFoundError:
+            self.logger.warning(f"Could not read image: {image_path.name}")
+            return None
         except Exception as e:
             self.logger.error(f"Error detecting QR code in {image_path.name}: {e}")
             return None
 
+    def _remember_qr(self, key: tuple, patient_id: Optional[str], persist: bool = True):
+        with self._qr_recent_lock:
+            self._qr_recent[key] = patient_id
+            self._qr_recent.move_to_end(key)
+            if len(self._qr_recent) > _QR_RECENT_SIZE:
+                self._qr_recent.popitem(last=False)
+        if persist and self._db is not None:
+            path, mtime_ns, _ = key
+            self._cache_store(path, mtime_ns, qr=patient_id or '')
+
+    def _opencv(self):
+        if self._cv2 is None:
+            import cv2
+            cv2.setNumThreads(1)
+            self._qr_read_flags = (
+                cv2.IMREAD_REDUCED_GRAYSCALE_4,
+                cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                cv2.IMREAD_GRAYSCALE,
+            )
+            self._cv2 = cv2
+        return self._cv2
+
+    def _pillow(self):
+        if self._pil_image is None:
+            from PIL import Image
+            self._pil_image = Image
+        return self._pil_image
+
+    def _pyzbar(self):
+        if self._zbar is None:
+            from pyzbar import pyzbar
+            self._zbar = pyzbar
+        return self._zbar
+
+    def _limit_qr_side(self, image):
+        side = max(image.shape[:2])
+        if side <= _QR_MAX_SIDE:
+            return image
+        scale = _QR_MAX_SIDE / side
+        return self._cv2.resize(image, None, fx=scale, fy=scale, interpolation=self._cv2.INTER_AREA)
+
+    def _qr_detector(self):
+        detector = getattr(self._cv_local, 'detector', None)
+        if detector is None:
+            detector = self._cv_local.detector = self._cv2.QRCodeDetector()
+        return detector
+
+    def _decode_qr(self, image) -> tuple[Optional[str], bool]:
+        try:
+            data, points, _ = self._qr_detector().detectAndDecode(image)
+        except self._cv2.error:
+            data, points = '', None
+        if data:
+            return data, True
+        located = points is not None
+
+        qr_codes = self._pyzbar().decode(image)
+        if not qr_codes:
+            return None, located
+        return qr_codes[0].data.decode('utf-8'), True
+
+    def _decode_qr_enhanced(self, image) -> Optional[str]:
+        clahe = self._cv2.createCLAHE(clipLimit=2.0)
+        return self._decode_qr(clahe.apply(image))[0] or self._decode_qr(self._cv2.bitwise_not(image))[0]
+
     def parse_patient_id(self, qr_data: str) -> Optional[str]:
-        if qr_data.startswith("PATIENT_ID:"):
-            return qr_data.replace("PATIENT_ID:", "").strip()
+        if qr_data.startswith(_PATIENT_PREFIX):
+            return qr_data[_PATIENT_PREFIX_LEN:].strip()
         return qr_data.strip()
 
-    def _should_skip_path(self, path: Path) -> bool:
-        name = path.name
-        return name.startswith('_') or name.startswith('.')
+    def _is_candidate(self, name: str) -> bool:
+        return name[:1] not in '._' and name.lower().endswith(self._suffix_tuple)
 
     def _collect_qualifying_photos(self, qr_timestamp: datetime, qr_image_path: Path) -> List[Path]:
         cutoff_time = qr_timestamp - timedelta(minutes=self.max_minutes_window)
-        qr_resolved = qr_image_path.resolve()
+        qr_stat = qr_image_path.stat()
+        qr_ino = qr_stat.st_ino if qr_stat.st_dev == self._watch_dev else None
+        qr_name = qr_image_path.name
+        slack_hours = self.exif_mtime_slack_hours if self.use_exif_timestamp else 0
+        low_ns = high_ns = None
+        if slack_hours is not None and slack_hours >= 0:
+            # Centred on the QR file's mtime, not its EXIF time, so a camera clock offset cancels out
+            slack_ns = int(slack_hours * 3600e9)
+            low_ns = qr_stat.st_mtime_ns - int(self.max_minutes_window * 60e9) - slack_ns
+            high_ns = qr_stat.st_mtime_ns + slack_ns
         qualifying = []
+        seen = {str(qr_image_path)}
 
-        for file in self.watch_folder.iterdir():
-            if not file.is_file():
-                continue
-            if self._should_skip_path(file):
+        candidates = []
+        for entry in self._iter_candidate_entries():
+            seen.add(entry.path)
+            if low_ns is not None and not low_ns <= entry.mtime_ns <= high_ns:
                 continue
-            if not self.is_image_file(file):
-                continue
-            if file.resolve() == qr_resolved:
-                continue
-
-            timestamp = self.get_image_timestamp(file)
+            if qr_ino is None:
+                # Overlay/bind mounts can report another device; fall back to the name,
+                # which is unique in the (non-recursive) watch folder however it was spelled
+                if entry.name == qr_name:
+                    continue
+            else:
+                try:
+                    if (entry.ino or os.stat(entry.path).st_ino) == qr_ino:
+                        continue
+                except FileNotFoundError:
+                    continue
+            candidates.append(entry)
+
+        self._forget_timestamps(self._ts_cache.keys() - seen)
+
+        timestamps = self._pool.map(self.get_image_timestamp_from_entry, candidates)
+        for entry, timestamp in zip(candidates, timestamps):
             if cutoff_time <= timestamp <= qr_timestamp:
-                qualifying.append((timestamp, file))
+                qualifying.append((timestamp, entry))
+                if len(qualifying) > self.max_photos_per_session:
+                    timestamps.close()
+                    raise SessionLimitExceeded(len(qualifying), self.max_photos_per_session)
 
         qualifying.sort(key=lambda item: item[0])
-        return [file for _, file in qualifying]
+        return [Path(entry.path) for _, entry in qualifying]
 
     def _generate_session_id(self, qr_timestamp: datetime) -> str:
         return qr_timestamp.strftime("%Y%m%d_%H%M%S")
 
     def _create_backup(self, session_id: str, photos: List[Path], qr_photo: Path, patient_id: str) -> Path:
-        backup_dir = self.watch_folder / self.backup_folder_name / session_id
+        backup_dir = self._backup_dir / session_id
         backup_dir.mkdir(parents=True, exist_ok=True)
 
-        for i, photo in enumerate(photos):
-            new_name = f"{i + 1:03d}{photo.suffix}"
-            dest = backup_dir / new_name
-            shutil.copy2(str(photo), str(dest))
-            self.logger.debug(f"Backed up: {photo.name} -> {backup_dir.name}/{new_name}")
+        pairs = [(photo, backup_dir / f"{i + 1:03d}{photo.suffix}") for i, photo in enumerate(photos)]
+        qr_dest = backup_dir / f"QR_{patient_id}{qr_photo.suffix}"
+        pairs.append((qr_photo, qr_dest))
 
-        qr_backup_name = f"QR_{patient_id}{qr_photo.suffix}"
-        dest = backup_dir / qr_backup_name
-        shutil.copy2(str(qr_photo), str(dest))
-        self.logger.debug(f"Backed up QR: {qr_photo.name} -> {backup_dir.name}/{qr_backup_name}")
+        futures = [self._backup_pool.submit(self._backup_file, src, dest) for src, dest in pairs]
+        done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in pending:
+            future.cancel()
+        for future in done:
+            future.result()
+
+        if self._debug_on:
+            for photo, dest in pairs[:-1]:
+                self.logger.debug("Backed up: %s -> %s/%s", photo.name, backup_dir.name, dest.name)
+            self.logger.debug("Backed up QR: %s -> %s/%s", qr_photo.name, backup_dir.name, qr_dest.name)
 
         total = len(photos) + 1
         self.logger.info(f"Backup created: {backup_dir} ({total} files)")
         return backup_dir
 
+    def _backup_file(self, src: Path, dest: Path):
+        if self._same_fs_backup:
+            try:
+                os.link(src, dest)
+                return
+            except FileExistsError:
+                dest.unlink()
+                os.link(src, dest)
+                return
+            except OSError as e:
+                if e.errno not in _LINK_UNSUPPORTED:
+                    raise
+                self._same_fs_backup = False
+                self.logger.info(f"Hard links unavailable for backups, copying instead: {e}")
+        shutil.copy2(str(src), str(dest))
+
+    def _move_file(self, src: Path, dest: Path):
+        if self._same_fs_dest:
+            try:
+                os.replace(src, dest)
+                return
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                self._same_fs_dest = False
+        shutil.move(str(src), str(dest))
+
     def _move_to_unprocessed(self, image_path: Path):
-        unprocessed_dir = self.watch_folder / self.unprocessed_folder_name
-        unprocessed_dir.mkdir(parents=True, exist_ok=True)
+        unprocessed_dir = self._unprocessed_dir
         dest = unprocessed_dir / image_path.name
         if dest.exists():
             stem = image_path.stem
@@ -194,7 +604,14 @@ class PhotoProcessor:
             while dest.exists():
                 dest = unprocessed_dir / f"{stem}_{counter}{suffix}"
                 counter += 1
-        shutil.move(str(image_path), str(dest))
+        try:
+            self._move_file(image_path, dest)
+        except FileNotFoundError:
+            # The folder may have been deleted while running; recreate it once
+            if unprocessed_dir.exists():
+                raise
+            unprocessed_dir.mkdir(parents=True, exist_ok=True)
+            self._move_file(image_path, dest)
         self.logger.info(f"No QR code detected, moved to unprocessed: {image_path.name} -> {dest.name}")
 
     def _update_patient_stats(self, patient_id: str, photo_count: int):
@@ -228,16 +645,13 @@ class PhotoProcessor:
             ])
 
     def _write_done(self, session_id: str, patient_id: str, count: int):
-        done_dir = self.watch_folder / self.done_folder_name
-        done_dir.mkdir(parents=True, exist_ok=True)
-        with open(done_dir / f"done_{session_id}_{patient_id}.txt", "w", encoding="utf-8") as f:
-            f.write(f"Patient: {patient_id}\nFiles moved: {count}\nCompleted: {datetime.now()}\n")
+        self._write_text(
+            self._done_dir / f"done_{session_id}_{patient_id}.txt",
+            f"Patient: {patient_id}\nFiles moved: {count}\nCompleted: {datetime.now()}\n",
+        )
 
     def _write_error_report(self, session_id: str, patient_id: str, error: Exception, context: str):
-        error_dir = self.watch_folder / self.error_folder_name
-        error_dir.mkdir(parents=True, exist_ok=True)
-
-        error_file = error_dir / f"error_{session_id}.txt"
+        error_file = self._error_dir / f"error_{session_id}.txt"
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         content = (
@@ -251,11 +665,18 @@ class PhotoProcessor:
             f"Error Message: {str(error)}\n"
         )
 
-        with open(error_file, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._write_text(error_file, content)
 
         self.logger.error(f"Error report written to {error_file}")
 
+    def _write_text(self, path: Path, content: str):
+        # The folder may have been deleted while running; recreate it once
+        try:
+            path.write_text(content, encoding='utf-8')
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content, encoding='utf-8')
+
     def organize_photos(self, patient_id: str, photos: List[Path], qr_photo: Path, qr_timestamp: datetime) -> int:
         date_folder = qr_timestamp.strftime("%Y.%m.%d")
         dest_folder = self.watch_folder / patient_id / date_folder
@@ -263,35 +684,56 @@ class PhotoProcessor:
 
         moved_count = 0
 
-        existing_nums = []
-        if dest_folder.exists():
-            for f in dest_folder.iterdir():
-                if f.is_file() and f.stem.isdigit():
-                    existing_nums.append(int(f.stem))
-        seq_start = max(existing_nums, default=0) + 1
+        counter_key = (patient_id, date_folder)
+        cached = self._seq_counters.get(counter_key)
+        if cached and cached[0] == dest_folder.stat().st_mtime_ns:
+            seq_num = cached[1] + 1
+        else:
+            seq_num = self._max_sequence(dest_folder) + 1
 
-        for i, image_path in enumerate(photos):
-            seq_num = seq_start + i
+        for image_path in photos:
             new_name = f"{seq_num:03d}{image_path.suffix}"
             dest_path = dest_folder / new_name
-
-            shutil.move(str(image_path), str(dest_path))
-            self.logger.debug(f"Moved: {image_path.name} -> {patient_id}/{date_folder}/{new_name}")
+            if dest_path.exists():
+                # Directory mtime is too coarse on some drives (FAT/exFAT) to trust the cached counter
+                seq_num = self._max_sequence(dest_folder) + 1
+                new_name = f"{seq_num:03d}{image_path.suffix}"
+                dest_path = dest_folder / new_name
+
+            self._move_file(image_path, dest_path)
+            if self._debug_on:
+                self.logger.debug("Moved: %s -> %s/%s/%s", image_path.name, patient_id, date_folder, new_name)
             moved_count += 1
+            seq_num += 1
 
         qr_dest_name = f"QR_{patient_id}{qr_photo.suffix}"
         qr_dest_path = dest_folder / qr_dest_name
         if qr_dest_path.exists():
+            with os.scandir(dest_folder) as it:
+                existing = {entry.name.lower() for entry in it}
             counter = 1
-            while qr_dest_path.exists():
-                qr_dest_path = dest_folder / f"QR_{patient_id}_{counter}{qr_photo.suffix}"
+            while f"QR_{patient_id}_{counter}{qr_photo.suffix}".lower() in existing:
                 counter += 1
-        shutil.move(str(qr_photo), str(qr_dest_path))
-        self.logger.debug(f"Moved QR: {qr_photo.name} -> {patient_id}/{date_folder}/{qr_dest_path.name}")
+            qr_dest_path = dest_folder / f"QR_{patient_id}_{counter}{qr_photo.suffix}"
+        self._move_file(qr_photo, qr_dest_path)
+        if self._debug_on:
+            self.logger.debug("Moved QR: %s -> %s/%s/%s", qr_photo.name, patient_id, date_folder, qr_dest_path.name)
         moved_count += 1
 
+        self._seq_counters[counter_key] = (dest_folder.stat().st_mtime_ns, seq_num - 1)
         return moved_count
 
+    def _max_sequence(self, folder: Path) -> int:
+        max_seq = 0
+        with os.scandir(folder) as it:
+            for entry in it:
+                name = entry.name
+                dot = name.rfind('.')
+                stem = name[:dot] if dot > 0 else name
+                if stem.isdigit():
+                    max_seq = max(max_seq, int(stem))
+        return max_seq
+
     def _process_qr_trigger(self, qr_image_path: Path, patient_id: str):
         qr_timestamp = self.get_image_timestamp(qr_image_path)
         session_id = self._generate_session_id(qr_timestamp)
@@ -299,23 +741,20 @@ class PhotoProcessor:
         self.logger.info(f"QR trigger: patient={patient_id}, session={session_id}")
 
         try:
-            qualifying_photos = self._collect_qualifying_photos(qr_timestamp, qr_image_path)
-
-            if len(qualifying_photos) > self.max_photos_per_session:
-                error_msg = (
-                    f"Photo count {len(qualifying_photos)} exceeds maximum "
-                    f"{self.max_photos_per_session} for session {session_id}"
-                )
+            try:
+                qualifying_photos = self._collect_qualifying_photos(qr_timestamp, qr_image_path)
+            except SessionLimitExceeded as e:
+                error_msg = f"{e} for session {session_id}"
                 self.logger.error(error_msg)
                 self._write_error_report(
                     session_id, patient_id,
                     ValueError(error_msg),
                     "Max photos per session exceeded"
                 )
-                self._append_csv_log(session_id, patient_id, len(qualifying_photos), "", "ERROR_MAX_EXCEEDED")
+                self._append_csv_log(session_id, patient_id, e.count, "", "ERROR_MAX_EXCEEDED")
                 self.logger.info(
                     f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ERROR "
-                    f"patient={patient_id} count={len(qualifying_photos)} session={session_id}"
+                    f"patient={patient_id} count={e.count} session={session_id}"
                 )
                 return
 
@@ -325,6 +764,7 @@ class PhotoProcessor:
                 patient_id, qualifying_photos, qr_image_path, qr_timestamp
             )
 
+            self._forget_timestamps([str(path) for path in qualifying_photos] + [str(qr_image_path)])
             self._write_done(session_id, patient_id, moved_count)
 
             date_folder = qr_timestamp.strftime("%Y.%m.%d")
@@ -345,18 +785,23 @@ class PhotoProcessor:
                 f"patient={patient_id} count=0 session={session_id}"
             )
             if self.stop_on_error:
-                self.stop_requested = True
+                self._stop_event.set()
 
     def process_images(self, new_images: List[Path], move_unprocessed: bool = False):
-        for image_path in new_images:
-            if not image_path.exists():
+        images = [image_path for image_path in new_images if image_path.exists()]
+        results = list(self._pool.map(self.detect_qr_code, images))
+
+        for image_path, patient_id in zip(images, results):
+            if not patient_id and not move_unprocessed:
                 continue
 
-            patient_id = self.detect_qr_code(image_path)
-            if patient_id:
-                self._process_qr_trigger(image_path, patient_id)
-            elif move_unprocessed:
-                self._move_to_unprocessed(image_path)
+            with self._session_lock:
+                if not image_path.exists():
+                    continue
+                if patient_id:
+                    self._process_qr_trigger(image_path, patient_id)
+                else:
+                    self._move_to_unprocessed(image_path)
 
     def scan_existing_images(self):
         self.logger.info("Scanning for existing images...")
@@ -364,18 +809,14 @@ class PhotoProcessor:
         expired = datetime.now() - timedelta(minutes=self.max_minutes_window)
 
         recent, stale = [], []
-        for file in self.watch_folder.iterdir():
-            if not file.is_file():
-                continue
-            if self._should_skip_path(file):
-                continue
-            if not self.is_image_file(file):
-                continue
-            ts = self.get_image_timestamp(file)
+        candidates = list(self._iter_candidate_entries())
+        timestamps = self._pool.map(self.get_image_timestamp_from_entry, candidates)
+
+        for entry, ts in zip(candidates, timestamps):
             if ts >= cutoff:
-                recent.append(file)
+                recent.append(Path(entry.path))
             elif ts < expired:
-                stale.append(file)
+                stale.append(Path(entry.path))
 
         if recent:
             self.logger.info(f"Found {len(recent)} recent images (within {self.startup_scan_minutes} min)")
@@ -387,12 +828,58 @@ class PhotoProcessor:
             self.logger.info(f"Found {len(stale)} stale images (older than {self.max_minutes_window} min), moving to unprocessed")
             self.process_images(stale, move_unprocessed=True)
 
+    def _collect_batch(self, events: queue.Queue) -> tuple[List[Path], bool]:
+        item = events.get()
+        if item is None:
+            return [], True
+
+        deadline, path = item
+        batch = [path]
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                item = events.get(timeout=remaining) if remaining > 0 else events.get_nowait()
+            except queue.Empty:
+                if remaining <= 0:
+                    return batch, False
+                continue
+            if item is None:
+                return batch, True
+            deadline = max(deadline, item[0])
+            batch.append(item[1])
+
+    def _process_events(self, events: queue.Queue):
+        while True:
+            batch, stopping = self._collect_batch(events)
+
+            paths = [path for path in dict.fromkeys(batch) if path.exists()]
+            try:
+                timestamps = self._pool.map(self._timestamp_or_none, paths)
+                ready = [path for path, ts in zip(paths, timestamps) if ts is not None]
+                if ready:
+                    self.process_images(ready)
+            except Exception as e:
+                self.logger.error(f"Error processing new images: {e}")
+
+            if stopping:
+                return
+
     def run(self):
         self.logger.info("Starting Photo Processor...")
 
         self.scan_existing_images()
 
         event_handler = PhotoEventHandler(self)
+        worker = threading.Thread(
+            target=self._process_events,
+            args=(event_handler.q,),
+            name="PhotoEventWorker",
+            daemon=True,
+        )
+        worker.start()
+
+        from watchdog.observers import Observer
+
         observer = Observer()
         observer.schedule(event_handler, str(self.watch_folder), recursive=False)
         observer.start()
@@ -406,15 +893,35 @@ class PhotoProcessor:
         print("="*60 + "\n")
 
         try:
-            while not self.stop_requested:
-                time.sleep(1)
+            self._wait_for_stop()
         except KeyboardInterrupt:
-            pass
+            self._stop_event.set()
 
         self.logger.info("Stopping Photo Processor...")
         observer.stop()
         observer.join()
+        event_handler.q.put(None)
+        worker.join()
         self.logger.info("Photo Processor stopped")
+        self.close()
+
+    def _wait_for_stop(self):
+        if sys.platform == 'win32':
+            # Untimed lock waits cannot be interrupted by Ctrl+C on Windows.
+            while not self._stop_event.wait(1):
+                pass
+        else:
+            self._stop_event.wait()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pool.shutdown(wait=True)
+        self._backup_pool.shutdown(wait=True)
+        if self._db is not None:
+            self._db.close()
+        self._log_listener.stop()
 
 
 class PhotoEventHandler(FileSystemEventHandler):
@@ -423,6 +930,7 @@ class PhotoEventHandler(FileSystemEventHandler):
         self.processor = processor
         self.last_process_time = 0
         self.process_delay = 2
+        self.q: queue.Queue = queue.Queue()
 
     def on_created(self, event):
         if event.is_directory:
@@ -430,13 +938,12 @@ class PhotoEventHandler(FileSystemEventHandler):
 
         file_path = Path(event.src_path)
 
-        if file_path.name.startswith('_') or file_path.name.startswith('.'):
+        if file_path.name[:1] in '._':
             return
 
         if self.processor.is_image_file(file_path):
             self.processor.logger.info(f"New image detected: {file_path.name}")
-            time.sleep(self.process_delay)
-            self.processor.process_images([file_path])
+            self.q.put((time.monotonic() + self.process_delay, file_path))
 
 
 def main():
@@ -448,6 +955,7 @@ def main():
         print("Please create a configuration file first.")
         sys.exit(1)
 
+    processor = None
     try:
         processor = PhotoProcessor()
         processor.run()
@@ -457,6 +965,9 @@ def main():
         print(f"\nFatal error: {e}")
         logging.exception("Fatal error occurred")
         sys.exit(1)
+    finally:
+        if processor is not None:
+            processor.close()
 
 
 if __name__ == "__main__":